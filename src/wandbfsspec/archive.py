@@ -0,0 +1,87 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import struct
+import tarfile
+import zipfile
+import zlib
+from typing import IO, Any, Dict
+
+__all__ = ["guess_archive_type", "build_index", "read_member"]
+
+ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+ZIP_LOCAL_HEADER_SIZE = 30
+
+
+def guess_archive_type(path: str) -> str:
+    """Return the archive type of `path` based on its extension."""
+    if path.endswith(".zip"):
+        return "zip"
+    if path.endswith(".tar"):
+        return "tar"
+    raise ValueError(
+        f"Path {path} must be either a `.zip` or an uncompressed `.tar` file, as"
+        " compressed tarballs can't be randomly accessed!"
+    )
+
+
+def build_index(f: IO[bytes], archive_type: str) -> Dict[str, Dict[str, Any]]:
+    """Build the index of the members of an archive, reading just its headers.
+
+    For `.zip` files that's the central directory at the end of the file, while for
+    `.tar` files the 512-byte header preceding every member is read, seeking over the
+    member contents. The resulting index is JSON-serializable so that it can be cached.
+    """
+    members: Dict[str, Dict[str, Any]] = {}
+    if archive_type == "zip":
+        with zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                members[info.filename] = {
+                    "offset": info.header_offset,
+                    "compressed_size": info.compress_size,
+                    "size": info.file_size,
+                    "compress_type": info.compress_type,
+                    "flag_bits": info.flag_bits,
+                }
+    elif archive_type == "tar":
+        f.seek(0)
+        with tarfile.open(fileobj=f, mode="r:") as tf:
+            for tar_info in tf:
+                if not tar_info.isfile():
+                    continue
+                members[tar_info.name] = {
+                    "offset": tar_info.offset_data,
+                    "size": tar_info.size,
+                }
+    else:
+        raise ValueError(f"Archive type {archive_type} is not supported!")
+    return members
+
+
+def read_member(
+    f: IO[bytes], archive_type: str, name: str, entry: Dict[str, Any]
+) -> bytes:
+    """Read the contents of the member `name` given its `entry` in the index."""
+    if archive_type == "tar":
+        f.seek(entry["offset"])
+        return f.read(entry["size"])
+    if entry["flag_bits"] & 0x1 or entry["compress_type"] not in (
+        zipfile.ZIP_STORED,
+        zipfile.ZIP_DEFLATED,
+    ):
+        # Encrypted or less common compression methods are left to `zipfile`
+        f.seek(0)
+        with zipfile.ZipFile(f) as zf:
+            return zf.read(name)
+    f.seek(entry["offset"])
+    header = f.read(ZIP_LOCAL_HEADER_SIZE)
+    if header[:4] != ZIP_LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header for member {name}!")
+    filename_length, extra_length = struct.unpack("<HH", header[26:30])
+    f.seek(entry["offset"] + ZIP_LOCAL_HEADER_SIZE + filename_length + extra_length)
+    data = f.read(entry["compressed_size"])
+    if entry["compress_type"] == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -zlib.MAX_WBITS)
+    return data
@@ -0,0 +1,90 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Union
+
+__all__ = ["MetadataCache"]
+
+
+class MetadataCache:
+    """Persistent key-value store for W&B metadata shared across processes.
+
+    The entries are stored in a SQLite database under `cache_dir`, so that every
+    process pointing to the same directory (e.g. PyTorch dataloader workers) reads
+    the metadata already resolved by any other one. A new connection is opened per
+    operation so that the cache is safe to use after a `fork`.
+
+    Args:
+        cache_dir: directory where the SQLite database will be stored.
+        timeout: seconds to wait for a lock held by another process.
+    """
+
+    filename = "metadata.sqlite"
+
+    def __init__(self, cache_dir: str, timeout: float = 30.0) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, self.filename)
+        self.timeout = timeout
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value"
+                " TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("DELETE FROM metadata WHERE expires_at < ?", (time.time(),))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def get(self, key: str) -> Any:
+        """Return the value stored under `key`, or None if missing or expired."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM metadata WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                # Conditional, in case another process has just refreshed the entry
+                with conn:
+                    conn.execute(
+                        "DELETE FROM metadata WHERE key = ? AND expires_at < ?",
+                        (key, now),
+                    )
+                return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Union[float, None] = None) -> None:
+        """Store a JSON-serializable `value`, forever if `ttl` is None."""
+        expires_at = time.time() + ttl if ttl is not None else None
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                (
+                    "INSERT OR REPLACE INTO metadata (key, value, expires_at) VALUES"
+                    " (?, ?, ?)"
+                ),
+                (key, json.dumps(value), expires_at),
+            )
+
+    def delete(self, key: str, prefix: bool = False) -> None:
+        """Remove the entry under `key`, or every entry starting with it if `prefix`."""
+        with closing(self._connect()) as conn, conn:
+            if prefix:
+                conn.execute(
+                    "DELETE FROM metadata WHERE substr(key, 1, ?) = ?", (len(key), key)
+                )
+            else:
+                conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """Remove every entry, including the permanent ones."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM metadata")
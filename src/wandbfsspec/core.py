@@ -1,26 +1,45 @@
 # Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
 # See LICENSE for details.
 
+import io
 import os
 import urllib.request
-from typing import Any, Literal, Union
+from typing import Any, Callable, Dict, List, Literal, Union
 
 import wandb
 from fsspec.spec import AbstractBufferedFile, AbstractFileSystem
 
+from wandbfsspec.archive import build_index, guess_archive_type, read_member
+from wandbfsspec.cache import MetadataCache
+from wandbfsspec.scheduler import BULK, INTERACTIVE, RequestScheduler, default_scheduler
+
+ARCHIVE_BLOCK_SIZE = 2**16
+
 __all__ = ["WandbFile", "WandbBaseFileSystem"]
 
 
 class WandbFile(AbstractBufferedFile):  # type: ignore
     def __init__(
-        self, fs: AbstractFileSystem, path: str, mode: Literal["rb", "wb"] = "rb"
+        self,
+        fs: AbstractFileSystem,
+        path: str,
+        mode: Literal["rb", "wb"] = "rb",
+        block_size: Union[int, Literal["default"]] = "default",
+        size: Union[int, None] = None,
     ) -> None:
-        super().__init__(fs=fs, path=path, mode=mode)
+        super().__init__(fs=fs, path=path, mode=mode, block_size=block_size, size=size)
+        # Resolved on the first read, and reused by the rest of reads of the file
+        self._url: Union[str, None] = None
 
     def _fetch_range(
         self, start: Union[int, None] = None, end: Union[int, None] = None
     ) -> Any:
-        return self.fs.cat_file(path=self.path, start=start, end=end)
+        if self._url is None:
+            self._url = self.fs.url(path=self.path)
+        # Reads through a file are interactive, even if readahead makes them larger
+        return self.fs.cat_file(
+            path=self.path, start=start, end=end, priority=INTERACTIVE, url=self._url
+        )
 
 
 class WandbBaseFileSystem(AbstractFileSystem):  # type: ignore
@@ -29,6 +48,9 @@ class WandbBaseFileSystem(AbstractFileSystem):  # type: ignore
     def __init__(
         self,
         api_key: Union[str, None] = None,
+        cache_dir: Union[str, None] = None,
+        cache_ttl: float = 300.0,
+        scheduler: Union[RequestScheduler, None] = None,
     ) -> None:
         super().__init__()
 
@@ -43,10 +65,55 @@ class WandbBaseFileSystem(AbstractFileSystem):  # type: ignore
 
         self.api = wandb.Api()
 
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.cache = MetadataCache(cache_dir=self.cache_dir) if self.cache_dir else None
+        self.cache_ttl = cache_ttl
+        self._archive_indexes: Dict[str, Dict[str, Any]] = {}
+
+        self._scheduler = scheduler
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        # Resolved on every call so that forked processes use their own default
+        return self._scheduler if self._scheduler else default_scheduler()
+
     @classmethod
     def split_path(self, path: str) -> Any:
         raise NotImplementedError("Needs to be implemented!")
 
+    def _cached(
+        self, key: str, func: Callable[[], Any], permanent: bool = False
+    ) -> Any:
+        """Read `key` through the metadata cache, calling `func` on a miss.
+
+        Mutable W&B data (e.g. run files) expires after `cache_ttl` seconds, while
+        `permanent` entries (e.g. immutable artifact versions) never expire.
+        """
+        if self.cache is None:
+            return func()
+        key = f"{self.protocol}::{key}"
+        value = self.cache.get(key)
+        if value is None:
+            value = func()
+            self.cache.set(key, value, ttl=None if permanent else self.cache_ttl)
+        return value
+
+    def _invalidate(self, key: str, prefix: bool = False) -> None:
+        """Drop the cached metadata under `key` after writing to W&B."""
+        if self.cache is not None:
+            self.cache.delete(key=f"{self.protocol}::{key}", prefix=prefix)
+
+    def _run(self, path: str) -> Any:
+        return self.scheduler.submit(
+            func=lambda: self.api.run(path), key=f"run::{path}"  # type: ignore
+        )
+
+    def _artifact(self, name: str, type: str) -> Any:
+        return self.scheduler.submit(
+            func=lambda: self.api.artifact(name=name, type=type),  # type: ignore
+            key=f"artifact::{type}/{name}",
+        )
+
     def open(self, path: str, mode: Literal["rb", "wb"] = "rb") -> WandbFile:
         *_, file_path = self.split_path(path=path)
         if not file_path:
@@ -57,11 +124,79 @@ class WandbBaseFileSystem(AbstractFileSystem):  # type: ignore
         raise NotImplementedError("Needs to be implemented!")
 
     def cat_file(
-        self, path: str, start: Union[int, None] = None, end: Union[int, None] = None
+        self,
+        path: str,
+        start: Union[int, None] = None,
+        end: Union[int, None] = None,
+        priority: Union[int, None] = None,
+        url: Union[str, None] = None,
     ) -> Any:
-        url = self.url(path=path)
-        req = urllib.request.Request(url=url)
+        req = urllib.request.Request(url=url if url else self.url(path=path))
+        if priority is None:
+            # Reads of up to a block go ahead of bulk transfers
+            size = end - (start or 0) if end else self.info(path).get("size")
+            priority = (
+                INTERACTIVE
+                if size is not None and size <= WandbFile.DEFAULT_BLOCK_SIZE
+                else BULK
+            )
         if not start and not end:
             start, end = 0, ""  # type: ignore
         req.add_header("Range", f"bytes={start}-{end}")
-        return urllib.request.urlopen(req).read()
+        return self.scheduler.submit(
+            func=lambda: urllib.request.urlopen(req).read(),
+            kind="http",
+            priority=priority,
+        )
+
+    def _archive_index(self, path: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the members index of the archive at `path`, cached per digest."""
+        archive_type = guess_archive_type(path=path)
+        digest = info.get("digest")
+        if not digest:
+            raise FileNotFoundError(f"Archive at {path} couldn't be found!")
+        if digest not in self._archive_indexes:
+
+            def load_index() -> Dict[str, Any]:
+                with WandbFile(
+                    self, path=path, block_size=ARCHIVE_BLOCK_SIZE, size=info["size"]
+                ) as f:
+                    return build_index(f=f, archive_type=archive_type)
+
+            self._archive_indexes[digest] = self._cached(
+                key=f"archive::{digest}", func=load_index, permanent=True
+            )
+        return self._archive_indexes[digest]
+
+    def members(
+        self, path: str, detail: bool = False
+    ) -> Union[List[str], List[Dict[str, Any]]]:
+        """List the members of a `.zip` or `.tar` file without downloading it."""
+        index = self._archive_index(path=path, info=self.info(path))
+        if not detail:
+            return list(index)
+        return [
+            {"name": name, "type": "file", "size": entry["size"]}
+            for name, entry in index.items()
+        ]
+
+    def cat_member(self, path: str, member: str) -> bytes:
+        """Return the contents of `member` fetching just its bytes from the archive."""
+        info = self.info(path)
+        index = self._archive_index(path=path, info=info)
+        if member not in index:
+            raise FileNotFoundError(f"`{member}` couldn't be found in {path}!")
+        with WandbFile(
+            self, path=path, block_size=ARCHIVE_BLOCK_SIZE, size=info["size"]
+        ) as f:
+            return read_member(
+                f=f,
+                archive_type=guess_archive_type(path=path),
+                name=member,
+                entry=index[member],
+            )
+
+    def open_member(self, path: str, member: str) -> io.BytesIO:
+        """Open `member` as a file-like object, fetching just its bytes from the archive.
+        """
+        return io.BytesIO(self.cat_member(path=path, member=member))
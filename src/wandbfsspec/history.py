@@ -0,0 +1,82 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import json
+import numbers
+from typing import IO, Any, Dict, Iterable, List, Union
+
+__all__ = ["history_columns", "write_history"]
+
+HISTORY_DEFAULT_COLUMNS = ["_step", "_runtime", "_timestamp"]
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "In order to read the run history as Parquet you need to install"
+            " `pyarrow`, either via `pip install pyarrow` or `pip install"
+            " wandbfsspec[history]`."
+        ) from e
+    return pyarrow
+
+
+def history_columns(
+    summary: Dict[str, Any], columns: Union[List[str], None] = None
+) -> List[str]:
+    """Return the history columns, defaulting to the keys in the run summary."""
+    if columns is None:
+        columns = sorted(key for key in summary if not key.startswith("_"))
+    return HISTORY_DEFAULT_COLUMNS[:1] + [c for c in columns if c != "_step"]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Number) and not isinstance(value, complex)
+
+
+def write_history(
+    pages: Iterable[List[Dict[str, Any]]],
+    columns: List[str],
+    summary: Dict[str, Any],
+    f: IO[bytes],
+) -> None:
+    """Write the history `pages` into `f` as Parquet, one row group per page.
+
+    Just a page is kept in memory at a time, so the column types are fixed upfront:
+    `_step` is an integer, the columns with a numeric value in the run `summary` are
+    floats, and any other column is a string, holding JSON for non-string values.
+    """
+    pa = _import_pyarrow()
+    schema = pa.schema(
+        [
+            (
+                column,
+                pa.int64()
+                if column == "_step"
+                else pa.float64()
+                if column in HISTORY_DEFAULT_COLUMNS
+                or column not in summary
+                or _is_number(summary[column])
+                else pa.string(),
+            )
+            for column in columns
+        ]
+    )
+    with pa.parquet.ParquetWriter(f, schema=schema) as writer:
+        for page in pages:
+            arrays = []
+            for field in schema:
+                values = [row.get(field.name) for row in page]
+                if pa.types.is_string(field.type):
+                    values = [
+                        v
+                        if v is None or isinstance(v, str)
+                        else json.dumps(v, default=str)
+                        for v in values
+                    ]
+                else:
+                    values = [v if _is_number(v) else None for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
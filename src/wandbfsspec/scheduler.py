@@ -0,0 +1,237 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import datetime
+import email.utils
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Literal, Tuple, Union
+
+__all__ = [
+    "INTERACTIVE",
+    "BULK",
+    "TokenBucket",
+    "RequestScheduler",
+    "default_scheduler",
+]
+
+INTERACTIVE = 0
+BULK = 1
+
+RETRY_STATUS_CODES = (429, 503)
+# Unlike a 503, a 429 guarantees that the request wasn't processed
+RATE_LIMIT_STATUS_CODES = (429,)
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def retry_after(
+    e: Union[BaseException, None], status_codes: Tuple[int, ...] = RETRY_STATUS_CODES
+) -> Union[float, None]:
+    """Return the seconds to wait if `e` comes from a rate-limited response.
+
+    Both `requests` (used by `wandb`) and `urllib` errors are inspected, as well as
+    the exceptions they've been wrapped in, e.g. `wandb.errors.CommError`.
+    """
+    if e is None:
+        return None
+    response = getattr(e, "response", None)
+    status_code = getattr(response, "status_code", None) or getattr(e, "code", None)
+    if status_code not in status_codes:
+        cause = getattr(e, "exc", None) or e.__cause__
+        if not isinstance(cause, BaseException):
+            return None
+        return retry_after(cause, status_codes=status_codes)
+    headers = getattr(response, "headers", None) or getattr(e, "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if value is None:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+    if date.tzinfo is None:
+        # Dates ending in `-0000` are parsed as naive, although those are in UTC
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    return max((date - now).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that serves the waiters by priority.
+
+    Args:
+        rate: tokens added per second.
+        capacity: maximum number of tokens, i.e. the allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Block until a token is available and no higher priority call is waiting."""
+        waiter = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    timeout = None
+                    if self._waiters[0] == waiter:
+                        self._refill()
+                        now = time.monotonic()
+                        if self._tokens >= 1 and now >= self._paused_until:
+                            self._tokens -= 1
+                            return
+                        timeout = max(
+                            self._paused_until - now, (1 - self._tokens) / self.rate
+                        )
+                    self._condition.wait(timeout=timeout)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`, e.g. as requested by `Retry-After`."""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+
+class RequestScheduler:
+    """Scheduler that all the requests to W&B are routed through.
+
+    GraphQL and HTTP calls are limited by separate token buckets, rate-limited
+    responses are retried after `Retry-After` seconds, and identical metadata calls
+    in-flight at the same time are coalesced so that just one of them hits W&B.
+
+    Args:
+        graphql_rate: GraphQL calls allowed per second.
+        http_rate: HTTP calls allowed per second.
+        max_retries: maximum retries for a rate-limited call.
+    """
+
+    def __init__(
+        self,
+        graphql_rate: float = 10.0,
+        http_rate: float = 50.0,
+        max_retries: int = 5,
+    ) -> None:
+        self.buckets = {
+            "graphql": TokenBucket(rate=graphql_rate, capacity=max(graphql_rate, 1)),
+            "http": TokenBucket(rate=http_rate, capacity=max(http_rate, 1)),
+        }
+        self.max_retries = max_retries
+
+        self._in_flight: Dict[str, "Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    def throttle(
+        self,
+        kind: Literal["graphql", "http"] = "graphql",
+        priority: int = INTERACTIVE,
+    ) -> None:
+        """Wait for a token, for calls that can't be retried through `submit`."""
+        self.buckets[kind].acquire(priority=priority)
+
+    def _call(
+        self,
+        func: Callable[[], Any],
+        kind: Literal["graphql", "http"],
+        priority: int,
+        idempotent: bool = True,
+    ) -> Any:
+        status_codes = RETRY_STATUS_CODES if idempotent else RATE_LIMIT_STATUS_CODES
+        retries = 0
+        while True:
+            self.throttle(kind=kind, priority=priority)
+            try:
+                return func()
+            except Exception as e:
+                seconds = retry_after(e, status_codes=status_codes)
+                if seconds is None or retries >= self.max_retries:
+                    raise
+                self.buckets[kind].pause(seconds=seconds)
+                retries += 1
+
+    def submit(
+        self,
+        func: Callable[[], Any],
+        kind: Literal["graphql", "http"] = "graphql",
+        priority: int = INTERACTIVE,
+        key: Union[str, None] = None,
+        idempotent: bool = True,
+    ) -> Any:
+        """Run `func` once a token is available, sharing its result with every
+        concurrent call submitted with the same `key`. Non-`idempotent` calls, e.g.
+        uploads or deletions, are just retried when rejected with a 429."""
+        if key is None:
+            return self._call(
+                func=func, kind=kind, priority=priority, idempotent=idempotent
+            )
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if future is None:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            future.set_result(
+                self._call(
+                    func=func, kind=kind, priority=priority, idempotent=idempotent
+                )
+            )
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+
+_default_scheduler: Union[RequestScheduler, None] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scheduler() -> RequestScheduler:
+    """Return the scheduler shared by every filesystem in the current process."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
+
+
+def _reset_default_scheduler() -> None:
+    # The locks, waiters and in-flight calls of the parent are meaningless in a
+    # forked child (e.g. a dataloader worker), as their owner threads aren't there
+    global _default_scheduler, _default_scheduler_lock
+    _default_scheduler = None
+    _default_scheduler_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_default_scheduler)
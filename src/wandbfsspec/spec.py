@@ -2,19 +2,32 @@
 # See LICENSE for details.
 
 import datetime
+import hashlib
+import io
+import itertools
+import json
 import logging
 import os
+import re
+import shutil
 import tempfile
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Union
+from typing import IO, Any, Dict, Iterator, List, Literal, Tuple, Union
 
 import wandb
 
-from wandbfsspec.core import WandbBaseFileSystem
+from wandbfsspec.core import WandbBaseFileSystem, WandbFile
+from wandbfsspec.history import history_columns, write_history
+from wandbfsspec.scheduler import BULK
 
 MAX_PATH_LENGTH_WITHOUT_FILE_PATH = 3
 MAX_ARTIFACT_LENGTH_WITHOUT_FILE_PATH = 5
 
+HISTORY_FILE = ".history.parquet"
+SUMMARY_FILE = ".summary.json"
+HISTORY_PAGE_SIZE = 1000
+FINISHED_RUN_STATES = ("finished", "crashed", "failed", "killed")
+
 logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
 
 __all__ = ["WandbFileSystem", "WandbArtifactStore"]
@@ -74,6 +87,7 @@ class WandbFileSystem(WandbBaseFileSystem):
                     "name": f"{base_path}/{filename.name}",
                     "type": "file",
                     "size": _file.size,
+                    "digest": _file.md5,
                 }
                 if detail
                 else f"{base_path}/{filename.name}"
@@ -97,29 +111,176 @@ class WandbFileSystem(WandbBaseFileSystem):
             )
         return files
 
+    def _file(self, entity: str, project: str, run_id: str, file_path: str) -> Any:
+        run = self._run(path=f"{entity}/{project}/{run_id}")
+        return self.scheduler.submit(
+            func=lambda: run.file(name=file_path),
+            key=f"file::{entity}/{project}/{run_id}/{file_path}",
+        )
+
+    def _invalidate_run(self, entity: str, project: str, run_id: str) -> None:
+        run_path = f"{entity}/{project}/{run_id}"
+        self._invalidate(key=f"ls::{run_path}")
+        self._invalidate(key=f"ls::{run_path}/", prefix=True)
+        self._invalidate(key=f"url::{run_path}/", prefix=True)
+
     def ls(
         self, path: str, detail: bool = False
     ) -> Union[List[str], List[Dict[str, Any]]]:
+        entity, project, run_id, file_path = self.split_path(path=path)
+        key = "/".join(p for p in (entity, project, run_id, file_path) if p)
+        files = self._cached(key=f"ls::{key}", func=lambda: self._ls(path=path))
+        return files if detail else [f["name"] for f in files]  # type: ignore
+
+    def _ls(self, path: str) -> List[Dict[str, Any]]:
         entity, project, run_id, file_path = self.split_path(path=path)
         if entity and project and run_id:
-            _files = self.api.run(f"{entity}/{project}/{run_id}").files()  # type: ignore
+            run = self._run(path=f"{entity}/{project}/{run_id}")
+            _files = self.scheduler.submit(
+                func=lambda: list(run.files()),
+                key=f"files::{entity}/{project}/{run_id}",
+            )
             base_path = f"{entity}/{project}/{run_id}"
-            return self.__ls_files(
+            return self.__ls_files(  # type: ignore
                 _files=_files,
                 base_path=f"{base_path}/{file_path}" if file_path else base_path,
                 file_path=file_path if file_path else Path("./"),
-                detail=detail,
+                detail=True,
             )
         elif entity and project:
-            _files = self.api.runs(f"{entity}/{project}")
-            base_path = f"{entity}/{project}"
-            return self.__ls_projects_or_runs(_files=_files, detail=detail)
+            _files = self.scheduler.submit(
+                func=lambda: list(self.api.runs(f"{entity}/{project}")),
+                key=f"runs::{entity}/{project}",
+            )
+            return self.__ls_projects_or_runs(_files=_files, detail=True)  # type: ignore
         elif entity:
-            _files = self.api.projects(entity=entity)  # type: ignore
-            base_path = entity
-            return self.__ls_projects_or_runs(_files=_files, detail=detail)
+            _files = self.scheduler.submit(
+                func=lambda: list(self.api.projects(entity=entity)),  # type: ignore
+                key=f"projects::{entity}",
+            )
+            return self.__ls_projects_or_runs(_files=_files, detail=True)  # type: ignore
         raise ValueError("You need to at least provide an `entity` value!")
 
+    def open(  # type: ignore
+        self,
+        path: str,
+        mode: Literal["rb", "wb"] = "rb",
+        columns: Union[List[str], None] = None,
+    ) -> Union[WandbFile, IO[bytes]]:
+        """Open a file, including the virtual `.history.parquet` and `.summary.json`"""
+        entity, project, run_id, file_path = self.split_path(path=path)
+        if file_path not in (HISTORY_FILE, SUMMARY_FILE):
+            return super().open(path=path, mode=mode)
+        if mode != "rb":
+            raise ValueError(f"{file_path} can just be opened in `rb` mode!")
+        run = self._run(path=f"{entity}/{project}/{run_id}")
+        if file_path == SUMMARY_FILE:
+            return io.BytesIO(self._summary(run=run))
+        return self._open_history(run=run, columns=columns)
+
+    def info(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """Return the file details, where the size of `.history.parquet` is just
+        known once cached, as those virtual files aren't listed by `ls`."""
+        entity, project, run_id, file_path = self.split_path(path=path)
+        if file_path not in (HISTORY_FILE, SUMMARY_FILE):
+            return super().info(path, **kwargs)  # type: ignore
+        run = self._run(path=f"{entity}/{project}/{run_id}")
+        size: Union[int, None] = None
+        if file_path == SUMMARY_FILE:
+            size = len(self._summary(run=run))
+        else:
+            lpath = self._history_cache_path(
+                run=run, keys=history_columns(summary=run.summary_metrics)
+            )
+            if lpath and os.path.exists(lpath):
+                size = os.path.getsize(lpath)
+        return {
+            "name": f"{entity}/{project}/{run_id}/{file_path}",
+            "type": "file",
+            "size": size,
+        }
+
+    @staticmethod
+    def _summary(run: Any) -> bytes:
+        return json.dumps(run.summary_metrics, default=str).encode()
+
+    def _history_cache_path(self, run: Any, keys: List[str]) -> Union[str, None]:
+        """Return where the history of `run` is cached, if it can be."""
+        if not self.cache_dir or run.state not in FINISHED_RUN_STATES:
+            return None
+        keys_id = hashlib.md5(",".join(keys).encode()).hexdigest()
+        return os.path.join(self.cache_dir, "history", *run.path, f"{keys_id}.parquet")
+
+    def _open_history(self, run: Any, columns: Union[List[str], None]) -> IO[bytes]:
+        keys = history_columns(summary=run.summary_metrics, columns=columns)
+        lpath = self._history_cache_path(run=run, keys=keys)
+        if lpath:
+            if os.path.exists(lpath):
+                return open(lpath, "rb")
+            os.makedirs(os.path.dirname(lpath), exist_ok=True)
+
+        # W&B just returns the rows with all the selected `columns`, if any
+        rows = iter(
+            run.scan_history(
+                keys=keys if columns else None, page_size=HISTORY_PAGE_SIZE
+            )
+        )
+
+        def pages() -> Iterator[List[Dict[str, Any]]]:
+            while True:
+                page: List[Dict[str, Any]] = []
+
+                def fetch_page() -> None:
+                    # Rows are appended as those arrive, so that a retry resumes the
+                    # page, as `scan_history` issues every GraphQL call lazily
+                    page.extend(itertools.islice(rows, HISTORY_PAGE_SIZE - len(page)))
+
+                self.scheduler.submit(func=fetch_page, priority=BULK)
+                if not page:
+                    return
+                yield page
+
+        if lpath is None:
+            f = tempfile.TemporaryFile()
+            write_history(pages=pages(), columns=keys, summary=run.summary_metrics, f=f)
+            f.seek(0)
+            return f
+        # Written aside and renamed so that concurrent readers never see partial files
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(lpath), suffix=".tmp", delete=False
+        ) as tmp:
+            try:
+                write_history(
+                    pages=pages(), columns=keys, summary=run.summary_metrics, f=tmp
+                )
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, lpath)
+        return open(lpath, "rb")
+
+    def cat_file(
+        self,
+        path: str,
+        start: Union[int, None] = None,
+        end: Union[int, None] = None,
+        priority: Union[int, None] = None,
+        url: Union[str, None] = None,
+    ) -> Any:
+        *_, file_path = self.split_path(path=path)
+        if file_path not in (HISTORY_FILE, SUMMARY_FILE):
+            return super().cat_file(
+                path=path, start=start, end=end, priority=priority, url=url
+            )
+        if start or end:
+            # Every call would build the file again, so open it once and seek instead
+            raise ValueError(
+                f"Ranged reads aren't supported for {file_path}, use `open` instead!"
+            )
+        with self.open(path=path) as f:
+            return f.read()
+
     def modified(self, path: str) -> datetime.datetime:
         """Return the modified timestamp of a file as a datetime.datetime"""
         entity, project, run_id, file_path = self.split_path(path=path)
@@ -127,7 +288,9 @@ class WandbFileSystem(WandbBaseFileSystem):
             raise ValueError(
                 "`file_path` can't be None, make sure the `path` is valid!"
             )
-        _file = self.api.run(f"{entity}/{project}/{run_id}").file(name=file_path)  # type: ignore
+        _file = self._file(
+            entity=entity, project=project, run_id=run_id, file_path=file_path  # type: ignore
+        )
         if not _file:
             raise FileNotFoundError(
                 f"`file` at {file_path} for {entity}/{project}/{run_id} couldn't be"
@@ -137,7 +300,16 @@ class WandbFileSystem(WandbBaseFileSystem):
 
     def url(self, path: str) -> str:
         entity, project, run_id, file_path = self.split_path(path=path)
-        _file = self.api.run(f"{entity}/{project}/{run_id}").file(name=file_path)  # type: ignore
+        return self._cached(  # type: ignore
+            key=f"url::{entity}/{project}/{run_id}/{file_path}",
+            func=lambda: self._url(path=path),
+        )
+
+    def _url(self, path: str) -> str:
+        entity, project, run_id, file_path = self.split_path(path=path)
+        _file = self._file(
+            entity=entity, project=project, run_id=run_id, file_path=file_path  # type: ignore
+        )
         if not _file:
             raise FileNotFoundError(
                 f"`file` at {file_path} for {entity}/{project}/{run_id} couldn't be"
@@ -161,8 +333,14 @@ class WandbFileSystem(WandbBaseFileSystem):
             _lpath = os.path.abspath(file_path)  # type: ignore
             os.makedirs(os.path.dirname(_lpath), exist_ok=True)
             os.replace(lpath, _lpath)
-        run = self.api.run(f"{entity}/{project}/{run_id}")  # type: ignore
-        run.upload_file(path=_lpath, root=".")
+        run = self._run(path=f"{entity}/{project}/{run_id}")
+        self.scheduler.submit(
+            func=lambda: run.upload_file(path=_lpath, root="."),
+            kind="http",
+            priority=BULK,
+            idempotent=False,
+        )
+        self._invalidate_run(entity=entity, project=project, run_id=run_id)  # type: ignore
 
     def get_file(
         self, rpath: str, lpath: str, overwrite: bool = False, **kwargs: Dict[str, Any]
@@ -170,11 +348,25 @@ class WandbFileSystem(WandbBaseFileSystem):
         if os.path.splitext(rpath)[1] == "":
             raise ValueError("`rpath` must be a file path with extension!")
         entity, project, run_id, file_path = self.split_path(path=rpath)
-        file = self.api.run(f"{entity}/{project}/{run_id}").file(name=file_path)  # type: ignore
+        if file_path in (HISTORY_FILE, SUMMARY_FILE):
+            if os.path.isdir(lpath):
+                lpath = os.path.join(lpath, file_path)
+            if os.path.exists(lpath) and not overwrite:
+                return
+            with self.open(path=rpath) as rf, open(lpath, "wb") as lf:
+                shutil.copyfileobj(rf, lf)
+            return
+        file = self._file(
+            entity=entity, project=project, run_id=run_id, file_path=file_path  # type: ignore
+        )
         _lpath = lpath
         if os.path.splitext(lpath)[1] != "":
             lpath = os.path.dirname(lpath)
-        file.download(root=lpath, replace=overwrite)
+        self.scheduler.submit(
+            func=lambda: file.download(root=lpath, replace=overwrite),
+            kind="http",
+            priority=BULK,
+        )
         src_path = os.path.abspath(f"{lpath}/{rpath.split('/')[-1]}")
         tgt_path = os.path.abspath(_lpath)
         if src_path != tgt_path and not os.path.isdir(tgt_path):
@@ -182,8 +374,11 @@ class WandbFileSystem(WandbBaseFileSystem):
 
     def rm_file(self, path: str) -> None:
         entity, project, run_id, file_path = self.split_path(path=path)
-        file = self.api.run(f"{entity}/{project}/{run_id}").file(name=file_path)  # type: ignore
-        file.delete()
+        file = self._file(
+            entity=entity, project=project, run_id=run_id, file_path=file_path  # type: ignore
+        )
+        self.scheduler.submit(func=file.delete, idempotent=False)
+        self._invalidate_run(entity=entity, project=project, run_id=run_id)  # type: ignore
 
     def cp_file(self, path1: str, path2: str, **kwargs: Dict[str, Any]) -> None:
         path1_ext = os.path.splitext(path1)[1]
@@ -227,9 +422,53 @@ class WandbArtifactStore(WandbBaseFileSystem):
         path += [None] * (MAX_ARTIFACT_LENGTH_WITHOUT_FILE_PATH - len(path))  # type: ignore
         return (*path, None)  # type: ignore
 
+    @staticmethod
+    def _is_immutable_version(artifact_version: Union[str, None]) -> bool:
+        """Aliases such as `latest` can be moved, while `v<N>` versions can't."""
+        return bool(artifact_version and re.fullmatch(r"v\d+", artifact_version))
+
+    def _manifest(
+        self,
+        entity: str,
+        project: str,
+        artifact_type: str,
+        artifact_name: str,
+        artifact_version: str,
+    ) -> Dict[str, Any]:
+        def load_manifest() -> Dict[str, Any]:
+            artifact = self._artifact(
+                name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
+                type=artifact_type,
+            )
+            manifest = self.scheduler.submit(func=artifact._load_manifest)
+            return {
+                "entity": artifact.entity,
+                "id": artifact.id,
+                "entries": {
+                    name: {"digest": entry.digest, "size": entry.size}
+                    for name, entry in manifest.entries.items()
+                },
+            }
+
+        return self._cached(  # type: ignore
+            key=f"manifest::{entity}/{project}/{artifact_type}/{artifact_name}/{artifact_version}",
+            func=load_manifest,
+            permanent=self._is_immutable_version(artifact_version),
+        )
+
     def ls(
         self, path: str, detail: bool = False
     ) -> Union[List[str], List[Dict[str, Any]]]:
+        split_path = self.split_path(path=path)
+        key = "/".join(p for p in split_path if p)
+        files = self._cached(
+            key=f"ls::{key}",
+            func=lambda: self._ls(path=path),
+            permanent=self._is_immutable_version(split_path[4]),
+        )
+        return files if detail else [f["name"] for f in files]  # type: ignore
+
+    def _ls(self, path: str) -> List[Dict[str, Any]]:
         (
             entity,
             project,
@@ -239,66 +478,80 @@ class WandbArtifactStore(WandbBaseFileSystem):
             _,
         ) = self.split_path(path=path)
         if entity and project and artifact_type and artifact_name and artifact_version:
+            manifest = self._manifest(
+                entity=entity,
+                project=project,
+                artifact_type=artifact_type,
+                artifact_name=artifact_name,
+                artifact_version=artifact_version,
+            )
             return [
-                f"{entity}/{project}/{artifact_type}/{artifact_name}/{artifact_version}/{f.name}"
-                if not detail
-                else {
-                    "name": f"{entity}/{project}/{artifact_type}/{artifact_name}/{artifact_version}/{f.name}",
+                {
+                    "name": f"{entity}/{project}/{artifact_type}/{artifact_name}/{artifact_version}/{name}",
                     "type": "file",
-                    "size": f.size,
+                    "size": entry["size"],
+                    "digest": entry["digest"],
                 }
-                for f in self.api.artifact(  # type: ignore
-                    name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
-                    type=artifact_type,
-                ).files()
+                for name, entry in manifest["entries"].items()
             ]
         elif entity and project and artifact_type and artifact_name:
             return [
-                f"{entity}/{project}/{artifact_type}/{artifact_name}/{v.name.split(':')[1]}"
-                if not detail
-                else {
+                {
                     "name": f"{entity}/{project}/{artifact_type}/{artifact_name}/{v.name.split(':')[1]}",
                     "type": "directory",
                     "size": 0,
                 }
-                for v in self.api.artifact_versions(  # type: ignore
-                    name=f"{entity}/{project}/{artifact_name}", type_name=artifact_type
+                for v in self.scheduler.submit(
+                    func=lambda: list(
+                        self.api.artifact_versions(  # type: ignore
+                            name=f"{entity}/{project}/{artifact_name}",
+                            type_name=artifact_type,
+                        )
+                    ),
+                    key=f"artifact_versions::{entity}/{project}/{artifact_type}/{artifact_name}",
                 )
             ]
         elif entity and project and artifact_type:
             return [
-                f"{entity}/{project}/{artifact_type}/{c.name}"
-                if not detail
-                else {
+                {
                     "name": f"{entity}/{project}/{artifact_type}/{c.name}",
                     "type": "directory",
                     "size": 0,
                 }
-                for c in self.api.artifact_type(  # type: ignore
-                    project=f"{entity}/{project}", type_name=artifact_type
-                ).collections()
+                for c in self.scheduler.submit(
+                    func=lambda: list(
+                        self.api.artifact_type(  # type: ignore
+                            project=f"{entity}/{project}", type_name=artifact_type
+                        ).collections()
+                    ),
+                    key=f"collections::{entity}/{project}/{artifact_type}",
+                )
             ]
         elif entity and project:
             return [
-                f"{entity}/{project}/{a.name}"
-                if not detail
-                else {
+                {
                     "name": f"{entity}/{project}/{a.name}",
                     "type": "directory",
                     "size": 0,
                 }
-                for a in self.api.artifact_types(project=f"{entity}/{project}")  # type: ignore
+                for a in self.scheduler.submit(
+                    func=lambda: list(
+                        self.api.artifact_types(project=f"{entity}/{project}")  # type: ignore
+                    ),
+                    key=f"artifact_types::{entity}/{project}",
+                )
             ]
         elif entity:
             return [
-                f"{entity}/{p.name}"
-                if not detail
-                else {
+                {
                     "name": f"{entity}/{p.name}",
                     "type": "directory",
                     "size": 0,
                 }
-                for p in self.api.projects(entity=entity)  # type: ignore
+                for p in self.scheduler.submit(
+                    func=lambda: list(self.api.projects(entity=entity)),  # type: ignore
+                    key=f"projects::{entity}",
+                )
             ]
         raise ValueError("You need to at least provide an `entity` value!")
 
@@ -312,9 +565,9 @@ class WandbArtifactStore(WandbBaseFileSystem):
             artifact_version,
             _,
         ) = self.split_path(path=path)
-        artifact = self.api.artifact(  # type: ignore
+        artifact = self._artifact(
             name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
-            type=artifact_type,
+            type=artifact_type,  # type: ignore
         )
         if not artifact:
             raise ValueError("`artifact` is None, make sure that it exists!")
@@ -330,9 +583,9 @@ class WandbArtifactStore(WandbBaseFileSystem):
             artifact_version,
             _,
         ) = self.split_path(path=path)
-        artifact = self.api.artifact(  # type: ignore
+        artifact = self._artifact(
             name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
-            type=artifact_type,
+            type=artifact_type,  # type: ignore
         )
         if not artifact:
             raise ValueError("`artifact` is None, make sure that it exists!")
@@ -347,14 +600,16 @@ class WandbArtifactStore(WandbBaseFileSystem):
             artifact_version,
             file_path,
         ) = self.split_path(path=path)
-        artifact = self.api.artifact(  # type: ignore
-            name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
-            type=artifact_type,
+        manifest = self._manifest(
+            entity=entity,  # type: ignore
+            project=project,  # type: ignore
+            artifact_type=artifact_type,  # type: ignore
+            artifact_name=artifact_name,  # type: ignore
+            artifact_version=artifact_version,  # type: ignore
         )
-        manifest = artifact._load_manifest()
-        digest = manifest.entries[file_path].digest
+        digest = manifest["entries"][file_path]["digest"]
         digest_id = wandb.util.b64_to_hex_id(digest)
-        return f"https://api.wandb.ai/artifactsV2/gcp-us/{artifact.entity}/{artifact.id}/{digest_id}"
+        return f"https://api.wandb.ai/artifactsV2/gcp-us/{manifest['entity']}/{manifest['id']}/{digest_id}"
 
     def get_file(
         self, lpath: str, rpath: str, overwrite: bool = False, **kwargs: Dict[str, Any]
@@ -367,14 +622,16 @@ class WandbArtifactStore(WandbBaseFileSystem):
             artifact_version,
             file_path,
         ) = self.split_path(path=rpath)
-        artifact = self.api.artifact(  # type: ignore
+        artifact = self._artifact(
             name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
-            type=artifact_type,
+            type=artifact_type,  # type: ignore
         )
-        path = artifact.get_path(name=file_path)
+        path = self.scheduler.submit(func=lambda: artifact.get_path(name=file_path))
         if os.path.exists(lpath) and not overwrite:
             return
-        path.download(root=lpath)
+        self.scheduler.submit(
+            func=lambda: path.download(root=lpath), kind="http", priority=BULK
+        )
 
     def rm_file(self, path: str, force_rm: bool = False) -> None:
         (
@@ -392,11 +649,17 @@ class WandbArtifactStore(WandbBaseFileSystem):
                     " `force_rm=True`."
                 )
                 return
-            artifact = self.api.artifact(  # type: ignore
+            artifact = self._artifact(
                 name=f"{entity}/{project}/{artifact_name}:{artifact_version}",
-                type=artifact_type,
+                type=artifact_type,  # type: ignore
+            )
+            self.scheduler.submit(
+                func=lambda: artifact.delete(delete_aliases=True), idempotent=False
             )
-            artifact.delete(delete_aliases=True)
+            collection_path = f"{entity}/{project}/{artifact_type}/{artifact_name}"
+            self._invalidate(key=f"ls::{collection_path}")
+            self._invalidate(key=f"ls::{collection_path}/", prefix=True)
+            self._invalidate(key=f"manifest::{collection_path}/", prefix=True)
             return
         logging.info(
             "W&B just lets you remove complete artifact versions not artifact files."
@@ -0,0 +1,60 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from wandbfsspec.archive import build_index, guess_archive_type, read_member
+
+from .utils import FILES_DIR
+
+
+@pytest.fixture
+def zip_file() -> io.BytesIO:
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, mode="w") as zf:
+        for i, filename in enumerate(sorted(os.listdir(FILES_DIR))):
+            zf.write(
+                os.path.join(FILES_DIR, filename),
+                arcname=filename,
+                compress_type=zipfile.ZIP_DEFLATED if i % 2 else zipfile.ZIP_STORED,
+            )
+    return f
+
+
+@pytest.fixture
+def tar_file() -> io.BytesIO:
+    f = io.BytesIO()
+    with tarfile.open(fileobj=f, mode="w:") as tf:
+        tf.add(FILES_DIR, arcname="files")
+    return f
+
+
+class TestArchive:
+    """Test `wandbfsspec.archive` functions."""
+
+    def test_guess_archive_type(self) -> None:
+        assert guess_archive_type(path="e/p/r/bundle.zip") == "zip"
+        assert guess_archive_type(path="e/p/r/bundle.tar") == "tar"
+        with pytest.raises(ValueError):
+            guess_archive_type(path="e/p/r/bundle.tar.gz")
+
+    def test_zip(self, zip_file: io.BytesIO) -> None:
+        """Test `build_index` and `read_member` functions on a `.zip` file."""
+        index = build_index(f=zip_file, archive_type="zip")
+        assert sorted(index) == sorted(os.listdir(FILES_DIR))
+        for name, entry in index.items():
+            with open(os.path.join(FILES_DIR, name), "rb") as f:
+                assert read_member(zip_file, "zip", name, entry) == f.read()
+
+    def test_tar(self, tar_file: io.BytesIO) -> None:
+        """Test `build_index` and `read_member` functions on a `.tar` file."""
+        index = build_index(f=tar_file, archive_type="tar")
+        assert sorted(index) == sorted(f"files/{f}" for f in os.listdir(FILES_DIR))
+        for name, entry in index.items():
+            with open(os.path.join(FILES_DIR, os.path.basename(name)), "rb") as f:
+                assert read_member(tar_file, "tar", name, entry) == f.read()
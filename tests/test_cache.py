@@ -0,0 +1,64 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from wandbfsspec.cache import MetadataCache
+
+
+class TestMetadataCache:
+    """Test `wandbfsspec.cache.MetadataCache` class methods."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmp_path: Path) -> None:
+        self.cache_dir = tmp_path.as_posix()
+        self.cache = MetadataCache(cache_dir=self.cache_dir)
+
+    def teardown(self) -> None:
+        del self.cache
+
+    def test_get_and_set(self) -> None:
+        """Test `MetadataCache.get` and `MetadataCache.set` methods."""
+        assert self.cache.get("missing") is None
+        self.cache.set("key", [{"name": "file.yaml", "size": 1}])
+        assert self.cache.get("key") == [{"name": "file.yaml", "size": 1}]
+
+    def test_ttl(self) -> None:
+        self.cache.set("key", "value", ttl=-1)
+        assert self.cache.get("key") is None
+        assert self.count() == 0
+
+    def test_purge_expired(self) -> None:
+        """Test that expired entries are removed when the cache is opened."""
+        for i in range(10):
+            self.cache.set(f"key-{i}", "value", ttl=-1)
+        self.cache.set("permanent", "value")
+        MetadataCache(cache_dir=self.cache_dir)
+        assert self.count() == 1
+
+    def count(self) -> int:
+        with closing(sqlite3.connect(self.cache.path)) as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0])
+
+    def test_shared_across_instances(self) -> None:
+        self.cache.set("key", "value")
+        assert MetadataCache(cache_dir=self.cache_dir).get("key") == "value"
+
+    def test_clear(self) -> None:
+        self.cache.set("key", "value")
+        self.cache.clear()
+        assert self.cache.get("key") is None
+
+    def test_delete(self) -> None:
+        """Test `MetadataCache.delete` method, either by key or by prefix."""
+        for key in ("ls::e/p/r", "ls::e/p/r/files", "ls::e/p/r2"):
+            self.cache.set(key, "value")
+        self.cache.delete("ls::e/p/r")
+        assert self.cache.get("ls::e/p/r") is None
+        self.cache.delete("ls::e/p/r/", prefix=True)
+        assert self.cache.get("ls::e/p/r/files") is None
+        assert self.cache.get("ls::e/p/r2") == "value"
@@ -0,0 +1,40 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import io
+from typing import Any, Dict, List
+
+import pytest
+
+from wandbfsspec.history import history_columns, write_history
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+class TestHistory:
+    """Test `wandbfsspec.history` functions."""
+
+    def test_history_columns(self) -> None:
+        summary = {"_step": 1, "_runtime": 2.0, "loss": 0.1, "acc": 0.9}
+        assert history_columns(summary=summary) == ["_step", "acc", "loss"]
+        assert history_columns(summary=summary, columns=["loss"]) == ["_step", "loss"]
+
+    def test_write_history(self) -> None:
+        """Test `write_history` function writing a row group per page."""
+        summary = {"loss": 0.1, "image": {"_type": "image-file"}}
+        pages: List[List[Dict[str, Any]]] = [
+            [{"_step": 0, "loss": 1}, {"_step": 1, "loss": 0.5}],
+            [{"_step": 2, "image": {"_type": "image-file"}}],
+        ]
+        f = io.BytesIO()
+        write_history(
+            pages=pages, columns=["_step", "loss", "image"], summary=summary, f=f
+        )
+        f.seek(0)
+        parquet_file = pq.ParquetFile(f)
+        assert parquet_file.num_row_groups == 2
+        assert parquet_file.read().to_pydict() == {
+            "_step": [0, 1, 2],
+            "loss": [1.0, 0.5, None],
+            "image": [None, None, '{"_type": "image-file"}'],
+        }
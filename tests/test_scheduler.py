@@ -0,0 +1,157 @@
+# Copyright 2022 Alvaro Bartolome, alvarobartt @ GitHub
+# See LICENSE for details.
+
+import os
+import threading
+import time
+import urllib.error
+from email.message import Message
+from typing import List
+
+import pytest
+
+from wandbfsspec.scheduler import (
+    BULK,
+    INTERACTIVE,
+    RequestScheduler,
+    TokenBucket,
+    default_scheduler,
+    retry_after,
+)
+
+
+def rate_limited_error(retry_after: str) -> urllib.error.HTTPError:
+    headers = Message()
+    headers["Retry-After"] = retry_after
+    return urllib.error.HTTPError(
+        url="https://api.wandb.ai", code=429, msg="", hdrs=headers, fp=None
+    )
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("2", 2.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("Wed, 21 Oct 2015 07:28:00 -0000", 0.0),
+        ("not a date", 1.0),
+    ],
+)
+def test_retry_after(value: str, seconds: float) -> None:
+    """Test `retry_after` function parsing either seconds or HTTP dates."""
+    assert retry_after(rate_limited_error(retry_after=value)) == seconds
+
+
+class TestRequestScheduler:
+    """Test `wandbfsspec.scheduler.RequestScheduler` class methods."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self) -> None:
+        self.scheduler = RequestScheduler(graphql_rate=100.0, http_rate=100.0)
+
+    def teardown(self) -> None:
+        del self.scheduler
+
+    def test_submit(self) -> None:
+        """Test `RequestScheduler.submit` method."""
+        assert self.scheduler.submit(func=lambda: 1) == 1
+
+    def test_submit_retry_after(self) -> None:
+        calls: List[float] = []
+
+        def func() -> int:
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise rate_limited_error(retry_after="0.2")
+            return 1
+
+        assert self.scheduler.submit(func=func, kind="http") == 1
+        assert len(calls) == 2 and calls[1] - calls[0] >= 0.2
+
+    def test_submit_max_retries(self) -> None:
+        def func() -> int:
+            raise rate_limited_error(retry_after="0")
+
+        self.scheduler.max_retries = 0
+        with pytest.raises(urllib.error.HTTPError):
+            self.scheduler.submit(func=func)
+
+    def test_submit_non_idempotent(self) -> None:
+        calls: List[int] = []
+
+        def func() -> int:
+            calls.append(1)
+            raise urllib.error.HTTPError(
+                url="https://api.wandb.ai", code=503, msg="", hdrs=Message(), fp=None
+            )
+
+        with pytest.raises(urllib.error.HTTPError):
+            self.scheduler.submit(func=func, idempotent=False)
+        assert calls == [1]
+
+    def test_submit_single_flight(self) -> None:
+        calls: List[int] = []
+        started = threading.Event()
+
+        def func() -> int:
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return len(calls)
+
+        results: List[int] = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.scheduler.submit(func, key="run"))
+            )
+            for _ in range(4)
+        ]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == [1] and results == [1] * 4
+
+
+class TestTokenBucket:
+    """Test `wandbfsspec.scheduler.TokenBucket` class methods."""
+
+    def test_acquire_priority(self) -> None:
+        """Test that `TokenBucket.acquire` serves interactive calls first."""
+        bucket = TokenBucket(rate=20.0, capacity=1.0)
+        bucket.acquire()
+        bucket.pause(seconds=0.5)
+        order: List[int] = []
+        barrier = threading.Barrier(parties=4)
+
+        def acquire(priority: int) -> None:
+            barrier.wait()
+            bucket.acquire(priority=priority)
+            order.append(priority)
+
+        threads = [
+            threading.Thread(target=acquire, args=(priority,))
+            for priority in (BULK, BULK, INTERACTIVE)
+        ]
+        for thread in threads:
+            thread.start()
+        # Every waiter is queued well before the pause expires
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        assert order == [INTERACTIVE, BULK, BULK]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires `os.fork`")
+def test_default_scheduler_after_fork() -> None:
+    """Test that a forked child doesn't inherit the parent `default_scheduler`."""
+    scheduler = default_scheduler()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, b"1" if default_scheduler() is not scheduler else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
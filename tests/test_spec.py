@@ -2,13 +2,21 @@
 # See LICENSE for details.
 
 import datetime
-from typing import List
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List
 
 import pytest
 
 from wandbfsspec.core import WandbFile
+from wandbfsspec.scheduler import BULK, RequestScheduler
 from wandbfsspec.spec import WandbArtifactStore, WandbFileSystem
 
+from .utils import ARCHIVE_NAMES, FILE_PATH, FILES_DIR, OfflineApi
+
 
 class TestWandbFileSystem:
     """Test `wandbfsspec.core.WandbFileSystem` class methods."""
@@ -36,6 +44,88 @@ class TestWandbFileSystem:
         _file = self.fs.open(path=f"{self.path}/{self.file_path}")
         assert isinstance(_file, WandbFile)
 
+    def test_cache(self, tmp_path: Path) -> None:
+        """Test that `ls`, `info` and `url` are shared through `cache_dir`."""
+        fs = WandbFileSystem(cache_dir=tmp_path.as_posix(), skip_instance_cache=True)
+        files = fs.ls(path=self.path)
+        info = fs.info(path=f"{self.path}/{self.file_path}")
+        url = fs.url(path=f"{self.path}/{self.file_path}")
+
+        fs = WandbFileSystem(cache_dir=tmp_path.as_posix(), skip_instance_cache=True)
+        fs.api = OfflineApi()
+        assert fs.ls(path=self.path) == files
+        assert fs.info(path=f"{self.path}/{self.file_path}") == info
+        assert fs.url(path=f"{self.path}/{self.file_path}") == url
+
+    def test_cache_invalidation(self, tmp_path: Path) -> None:
+        """Test that `put_file` and `rm_file` invalidate the cached `ls`."""
+        fs = WandbFileSystem(cache_dir=tmp_path.as_posix(), skip_instance_cache=True)
+        file_path = "cache-invalidation.yaml"
+        lpath = (tmp_path / file_path).as_posix()
+        shutil.copyfile(FILE_PATH, lpath)
+        assert not fs.exists(path=f"{self.path}/{file_path}")
+        try:
+            fs.put_file(lpath=lpath, rpath=f"{self.path}/{file_path}")
+            assert fs.exists(path=f"{self.path}/{file_path}")
+            fs.rm_file(path=f"{self.path}/{file_path}")
+            assert not fs.exists(path=f"{self.path}/{file_path}")
+        finally:
+            # `put_file` moves the file to the current working directory
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def test_cat_priority(self, tmp_path: Path) -> None:
+        """Test that a small `cat` is served ahead of a queued bulk transfer."""
+        scheduler = RequestScheduler(http_rate=0.5)
+        fs = WandbFileSystem(cache_dir=tmp_path.as_posix(), scheduler=scheduler)
+        path = f"{self.path}/{self.file_path}"
+        # Cached upfront so that both calls are queued on the drained HTTP bucket
+        fs.info(path=path)
+        fs.url(path=path)
+        scheduler.throttle(kind="http")
+        order: List[str] = []
+        barrier = threading.Barrier(parties=2)
+
+        def bulk() -> None:
+            barrier.wait()
+            scheduler.submit(
+                func=lambda: order.append("bulk"), kind="http", priority=BULK
+            )
+
+        def cat() -> None:
+            barrier.wait()
+            fs.cat(path)
+            order.append("cat")
+
+        threads = [threading.Thread(target=bulk), threading.Thread(target=cat)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert order == ["cat", "bulk"]
+
+    @pytest.mark.parametrize("archive_name", ARCHIVE_NAMES)
+    def test_members(self, archive_name: str) -> None:
+        """Test `WandbFileSystem.members` and `WandbFileSystem.cat_member` methods."""
+        path = f"{self.path}/{archive_name}"
+        assert sorted(self.fs.members(path=path)) == sorted(os.listdir(FILES_DIR))
+        for member in os.listdir(FILES_DIR):
+            with open(os.path.join(FILES_DIR, member), "rb") as f:
+                assert self.fs.cat_member(path=path, member=member) == f.read()
+
+    def test_open_summary(self) -> None:
+        with self.fs.open(path=f"{self.path}/.summary.json") as f:
+            assert isinstance(json.load(f), Dict)
+
+    def test_info_history(self) -> None:
+        info = self.fs.info(path=f"{self.path}/.history.parquet")
+        assert info["type"] == "file"
+
+    def test_open_history(self) -> None:
+        pq = pytest.importorskip("pyarrow.parquet")
+        with self.fs.open(path=f"{self.path}/.history.parquet") as f:
+            assert "_step" in pq.read_table(f).column_names
+
 
 class TestWandbArtifactStore:
     """Test `wandbfsspec.core.WandbArtifactStore` class methods."""
@@ -64,6 +154,35 @@ class TestWandbArtifactStore:
         files = self.fs.ls(path=self.path)
         assert isinstance(files, List)
 
+    def test_cache(self, tmp_path: Path) -> None:
+        """Test that `v<N>` versions are cached forever, while aliases expire."""
+        fs = WandbArtifactStore(
+            cache_dir=tmp_path.as_posix(), cache_ttl=-1, skip_instance_cache=True
+        )
+        files = fs.ls(path=self.path)
+        url = fs.url(path=f"{self.path}/{self.file_path}")
+        latest_path = f"{self.path.rsplit('/', 1)[0]}/latest"
+        fs.ls(path=latest_path)
+
+        fs = WandbArtifactStore(
+            cache_dir=tmp_path.as_posix(), cache_ttl=-1, skip_instance_cache=True
+        )
+        fs.api = OfflineApi()
+        assert fs.ls(path=self.path) == files
+        assert fs.url(path=f"{self.path}/{self.file_path}") == url
+        with pytest.raises(AssertionError):
+            fs.ls(path=latest_path)
+
+    @pytest.mark.parametrize("archive_name", ARCHIVE_NAMES)
+    def test_members(self, archive_name: str) -> None:
+        """Test `WandbArtifactStore.members` and `WandbArtifactStore.cat_member` methods.
+        """
+        path = f"{self.path}/{archive_name}"
+        assert sorted(self.fs.members(path=path)) == sorted(os.listdir(FILES_DIR))
+        for member in os.listdir(FILES_DIR):
+            with open(os.path.join(FILES_DIR, member), "rb") as f:
+                assert self.fs.cat_member(path=path, member=member) == f.read()
+
     def test_created(self) -> None:
         created = self.fs.created(path=f"{self.path}/{self.file_path}")
         assert isinstance(created, datetime.datetime)
@@ -2,7 +2,9 @@
 # See LICENSE for details.
 
 import os
-from typing import Union
+import tarfile
+import zipfile
+from typing import Any, Union
 
 import wandb
 from pydantic.dataclasses import dataclass
@@ -10,6 +12,15 @@ from pydantic.dataclasses import dataclass
 DATA_PATH = os.path.abspath("tests/data")
 FILE_PATH = os.path.join(DATA_PATH, "file.yaml")
 FILES_DIR = os.path.join(DATA_PATH, "files")
+ARCHIVE_NAMES = ["bundle.zip", "bundle.tar"]
+
+
+class OfflineApi:
+    """Stand-in for `wandb.Api` that fails on any call, so as to check that the
+    metadata is read from the cache."""
+
+    def __getattr__(self, name: str) -> Any:
+        raise AssertionError(f"`wandb.Api.{name}` shouldn't have been called!")
 
 
 @dataclass
@@ -50,8 +61,21 @@ class MockRun:
         files = [os.path.relpath(file, f"{wandb.run.dir}/files") for file in files]
         assert all(file in files for file in os.listdir(FILES_DIR))
 
+        archives = [os.path.join(wandb.run.dir, name) for name in ARCHIVE_NAMES]
+        with zipfile.ZipFile(archives[0], mode="w") as zf, tarfile.open(
+            archives[1], mode="w:"
+        ) as tf:
+            for file in sorted(os.listdir(FILES_DIR)):
+                zf.write(os.path.join(FILES_DIR, file), arcname=file)
+                tf.add(os.path.join(FILES_DIR, file), arcname=file)
+        for archive in archives:
+            files = wandb.save(glob_str=archive, policy="now")
+            assert os.path.basename(archive) in [os.path.basename(f) for f in files]
+
         artifact = wandb.Artifact("files", type="dataset")
         artifact.add_dir(DATA_PATH)
+        for archive in archives:
+            artifact.add_file(archive)
         wandb.log_artifact(artifact)
         artifact.wait()
 